@@ -0,0 +1,170 @@
+# data.py
+# Shared, cached loaders for the Olist tables, so every page reuses one parsed copy.
+# The load_* frames are st.cache_resource singletons handed out without copying:
+# treat them as read-only and derive new frames (filter/merge/assign) instead.
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+def _resolve_data_dir() -> Path:
+    local = Path("data")
+    return local if local.exists() else Path("/mnt/data")
+
+
+DATA_DIR = _resolve_data_dir()
+
+
+CACHE_DIR = DATA_DIR / "_cache"
+
+
+_SIBLING_INPUTS = {"olist_products_dataset.csv": ["product_category_name_translation.csv"]}
+
+
+def _source_path(name: str) -> Path:
+    csv_path = DATA_DIR / name
+    parquet_path = csv_path.with_suffix(".parquet")
+    if not parquet_path.exists():
+        return csv_path
+    inputs = [csv_path, *(DATA_DIR / extra for extra in _SIBLING_INPUTS.get(name, []))]
+    newest = max((p.stat().st_mtime_ns for p in inputs if p.exists()), default=0)
+    return parquet_path if parquet_path.stat().st_mtime_ns >= newest else csv_path
+
+
+def _write_parquet(df: pd.DataFrame, path: Path) -> None:
+    # Unique temp file + rename, so no reader ever sees a partial file.
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp, compression="snappy", index=False)
+        os.replace(tmp, path)
+    except (OSError, ValueError, TypeError):
+        pass  # read-only data dir or a frame Arrow cannot store
+    finally:
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
+
+
+def _parse_csv(path: Path) -> pd.DataFrame:
+    try:
+        return pd.read_csv(path, engine="pyarrow")
+    except pd.errors.ParserError:
+        # Arrow rejects quoted multi-line fields (e.g. the reviews table).
+        return pd.read_csv(path)
+
+
+def _with_english_category(products: pd.DataFrame) -> pd.DataFrame:
+    trans = read_csv("product_category_name_translation.csv")
+    products = products.merge(trans, on="product_category_name", how="left")
+    products["category"] = products.pop("product_category_name_english").fillna("unknown")
+    return products.drop(columns="product_category_name")
+
+
+def read_csv(name: str, columns: list[str] | None = None) -> pd.DataFrame:
+    path = _source_path(name)
+    if path.suffix == ".parquet":
+        return pd.read_parquet(path, columns=columns)
+    if not path.exists():
+        raise FileNotFoundError(f"Missing file: {path.resolve()}")
+    df = _parse_csv(path)
+    if name == "olist_products_dataset.csv":
+        df = _with_english_category(df)
+    _write_parquet(df, path.with_suffix(".parquet"))
+    return df if columns is None else df[columns]
+
+
+def load_persisted(
+    stem: str, sources: list[str], build: Callable[[], pd.DataFrame], version: int = 1
+) -> pd.DataFrame:
+    # Disk cache keyed on the source CSVs' mtimes; bump `version` when `build` changes.
+    mtimes = ":".join(str(_key_path(name).stat().st_mtime_ns) for name in sources)
+    key = hashlib.md5(f"v{version}:{mtimes}".encode()).hexdigest()[:12]
+    path = CACHE_DIR / f"{stem}_{key}.parquet"
+    if path.exists():
+        return pd.read_parquet(path)
+    df = build()
+    try:
+        CACHE_DIR.mkdir(exist_ok=True)
+    except OSError:
+        return df
+    _write_parquet(df, path)
+    _prune_stale(stem, path)
+    return df
+
+
+def _key_path(name: str) -> Path:
+    csv_path = DATA_DIR / name
+    return csv_path if csv_path.exists() else _source_path(name)
+
+
+def _prune_stale(stem: str, current: Path) -> None:
+    for old in CACHE_DIR.glob(f"{stem}_*.parquet"):
+        key = old.name[len(stem) + 1 : -len(".parquet")]
+        if old != current and len(key) == 12 and all(c in "0123456789abcdef" for c in key):
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+@st.cache_resource(show_spinner=False)
+def load_items() -> pd.DataFrame:
+    # Keep price as float64: float32 totals (~13.6M) cannot hold cents.
+    return read_csv(
+        "olist_order_items_dataset.csv",
+        columns=["order_id", "product_id", "seller_id", "price", "freight_value"],
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def load_orders() -> pd.DataFrame:
+    orders = read_csv(
+        "olist_orders_dataset.csv",
+        columns=[
+            "order_id",
+            "order_status",
+            "order_purchase_timestamp",
+            "order_delivered_customer_date",
+            "order_estimated_delivery_date",
+        ],
+    )
+    orders["order_status"] = orders["order_status"].astype("category")
+    return orders
+
+
+@st.cache_resource(show_spinner=False)
+def load_sellers() -> pd.DataFrame:
+    sellers = read_csv(
+        "olist_sellers_dataset.csv",
+        columns=["seller_id", "seller_state", "seller_zip_code_prefix"],
+    )
+    sellers["seller_state"] = sellers["seller_state"].astype("category")
+    return sellers
+
+
+@st.cache_resource(show_spinner=False)
+def load_seller_orders() -> pd.DataFrame:
+    items = load_items()[["order_id", "seller_id", "price", "freight_value"]]
+    orders = load_orders()[["order_id", "order_status", "order_purchase_timestamp"]]
+
+    df = items.merge(orders, on="order_id", how="left")
+    df = df.merge(load_sellers(), on="seller_id", how="left")
+    df = df.dropna(subset=["order_purchase_timestamp", "seller_state"])
+    # Sorted by purchase time so date filters can binary-search.
+    df = df.sort_values("order_purchase_timestamp", kind="stable", ignore_index=True)
+    # Midnight-normalized datetime64 rather than boxed datetime.date objects.
+    df["order_date"] = df["order_purchase_timestamp"].dt.normalize()
+    df["order_code"] = pd.factorize(df["order_id"])[0].astype(np.int32)
+    return df
+
+
+@st.cache_resource(show_spinner=False)
+def load_products_with_category() -> pd.DataFrame:
+    return read_csv("olist_products_dataset.csv", columns=["product_id", "category"])
@@ -1,12 +1,6 @@
-import streamlit as st
+import importlib
 
-import page_1
-import page_2
-import page_3
-import page_4
-import page_5
-import page_6
-import page_7
+import streamlit as st
 
 from ui import inject_global_css
 
@@ -19,14 +13,15 @@ st.set_page_config(
 
 inject_global_css()
 
+# Page modules are imported lazily, so only the selected page pays its import cost.
 PAGES = {
-    "01 — Categories & Revenue Concentration": page_1,
-    "02 — Orders & Revenue Over Time": page_2,
-    "03 — Page 3": page_3,
-    "04 — Page 4": page_4,
-    "05 — Page 5": page_5,
-    "06 — Page 6": page_6,
-    "07 — Page 7": page_7,
+    "01 — Categories & Revenue Concentration": "page_1",
+    "02 — Orders & Revenue Over Time": "page_2",
+    "03 — Page 3": "page_3",
+    "04 — Page 4": "page_4",
+    "05 — Page 5": "page_5",
+    "06 — Page 6": "page_6",
+    "07 — Page 7": "page_7",
 }
 
 with st.sidebar:
@@ -36,4 +31,4 @@ with st.sidebar:
     st.divider()
     st.caption("Tip: Hover charts, box-select, and zoom.")
 
-PAGES[choice].render()
\ No newline at end of file
+importlib.import_module(PAGES[choice]).render()
@@ -1,24 +1,65 @@
-from pathlib import Path
-
+import numpy as np
 import pandas as pd
 import streamlit as st
 import altair as alt
 
+from data import load_items, load_persisted, load_products_with_category
+
+
+@st.cache_data(show_spinner=False)
+def _load_items_with_category() -> pd.DataFrame:
+    items = load_items()[["product_id", "price"]]
+    products = load_products_with_category()
+
+    df = items.merge(
+        products.drop_duplicates("product_id"),
+        on="product_id",
+        how="left",
+        validate="m:1",
+        sort=False,
+    ).drop(columns="product_id")
+    # Categorical keys let the groupby hash ~70 int codes instead of one string per item.
+    df["category"] = df["category"].fillna("unknown").astype("category")
+    return df.dropna(subset=["price"])
 
-def _resolve_data_dir() -> Path:
-    local = Path("data")
-    return local if local.exists() else Path("/mnt/data")
 
+def _build_category_stats(trim_outliers: bool) -> pd.DataFrame:
+    df = _load_items_with_category()
 
-DATA_DIR = _resolve_data_dir()
+    total_revenue_all = float(df["price"].sum()) if len(df) else 0.0
+
+    if trim_outliers and len(df):
+        prices = df["price"].to_numpy()
+        lo, hi = np.percentile(prices, [1.0, 99.0])
+        df = df[(prices >= lo) & (prices <= hi)]
+
+    stats = (
+        df.groupby("category", observed=True, sort=False)
+        .agg(
+            revenue=("price", "sum"),
+            avg_price=("price", "mean"),
+            items=("price", "size"),
+        )
+        .reset_index()
+    )
+    # Stored in attrs so the untrimmed total round-trips through the Parquet cache.
+    stats.attrs["total_revenue_all"] = total_revenue_all
+    return stats
 
 
 @st.cache_data(show_spinner=False)
-def read_csv(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path.resolve()}")
-    return pd.read_csv(path)
+def _load_category_stats(trim_outliers: bool) -> tuple[pd.DataFrame, float]:
+    stats = load_persisted(
+        f"category_stats_trim{int(trim_outliers)}",
+        [
+            "olist_order_items_dataset.csv",
+            "olist_products_dataset.csv",
+            "product_category_name_translation.csv",
+        ],
+        lambda: _build_category_stats(trim_outliers),
+        version=2,
+    )
+    return stats, float(stats.attrs["total_revenue_all"])
 
 
 def _format_money(x: float) -> str:
@@ -36,39 +77,7 @@ def render():
         trim_outliers = st.checkbox("Trim extreme prices (1%–99%)", value=True)
         show_table = st.checkbox("Show aggregated table", value=False)
 
-    items = read_csv("olist_order_items_dataset.csv")
-    products = read_csv("olist_products_dataset.csv")
-
-    translation_path = DATA_DIR / "product_category_name_translation.csv"
-    if translation_path.exists():
-        trans = pd.read_csv(translation_path)
-        products = products.merge(trans, on="product_category_name", how="left")
-        cat_col = "product_category_name_english"
-    else:
-        cat_col = "product_category_name"
-
-    products[cat_col] = products[cat_col].fillna("unknown")
-    items["price"] = pd.to_numeric(items["price"], errors="coerce")
-
-    df = items.merge(products[["product_id", cat_col]], on="product_id", how="left")
-    df[cat_col] = df[cat_col].fillna("unknown")
-    df = df.dropna(subset=["price"])
-
-    total_revenue_all = float(df["price"].sum()) if len(df) else 0.0
-
-    if trim_outliers and len(df):
-        lo, hi = df["price"].quantile([0.01, 0.99]).tolist()
-        df = df[(df["price"] >= lo) & (df["price"] <= hi)]
-
-    stats = (
-        df.groupby(cat_col)
-        .agg(
-            revenue=("price", "sum"),
-            avg_price=("price", "mean"),
-            items=("price", "size"),
-        )
-        .reset_index()
-    )
+    stats, total_revenue_all = _load_category_stats(trim_outliers)
 
     if sort_by == "Revenue":
         stats = stats.sort_values("revenue", ascending=False)
@@ -89,15 +98,20 @@ def render():
     c1.metric("Total revenue", _format_money(total_revenue_all))
     c2.metric(f"Top-{top_n} revenue", _format_money(top_revenue))
     c3.metric(f"Top-{top_n} share", f"{top_share:.1f}%")
-    c4.metric("Categories (unique)", f"{stats[cat_col].nunique():,}")
+    c4.metric("Categories (unique)", f"{stats['category'].nunique():,}")
 
     st.divider()
 
     # ---- Left: interactive bar chart for revenue
-    base = alt.Chart(stats_top).encode(
-        x=alt.X(f"{cat_col}:N", sort="-y", title="Category"),
+    # Named datasets: the frames travel as Arrow instead of inside the Altair spec.
+    base = alt.Chart(alt.Data(name="stats_top")).encode(
+        x=alt.X(
+            "category:N",
+            sort=alt.EncodingSortField("revenue", order="descending"),
+            title="Category",
+        ),
         tooltip=[
-            alt.Tooltip(f"{cat_col}:N", title="Category"),
+            alt.Tooltip("category:N", title="Category"),
             alt.Tooltip("revenue:Q", title="Revenue", format=",.2f"),
             alt.Tooltip("avg_price:Q", title="Avg price", format=",.2f"),
             alt.Tooltip("items:Q", title="Items", format=","),
@@ -114,7 +128,15 @@ def render():
         text=alt.Text("revenue_pct_of_total:Q", format=".1f"),
     )
 
-    revenue_chart = (bar + label).properties(height=420).interactive()
+    avg_line = base.mark_line(color="#E45756", strokeWidth=2, point=True).encode(
+        y=alt.Y("avg_price:Q", title="Average price"),
+    )
+
+    revenue_chart = (
+        alt.layer(bar + label, avg_line)
+        .resolve_scale(y="independent")
+        .properties(height=420)
+    )
 
     # ---- Right: concentration chart (Top-N vs Rest)
     share_df = pd.DataFrame(
@@ -125,7 +147,7 @@ def render():
     )
 
     share_chart = (
-        alt.Chart(share_df)
+        alt.Chart(alt.Data(name="share"))
         .mark_bar(cornerRadius=10)
         .encode(
             y=alt.Y("group:N", title=None, sort=["All other categories", f"Top {top_n}"]),
@@ -142,16 +164,22 @@ def render():
     left, right = st.columns([3.2, 1.3], vertical_alignment="top")
     with left:
         st.subheader("Top categories (interactive)")
-        st.altair_chart(revenue_chart, use_container_width=True)
+        st.vega_lite_chart(
+            {**revenue_chart.to_dict(), "datasets": {"stats_top": stats_top}},
+            use_container_width=True,
+        )
 
     with right:
         st.subheader("Concentration")
-        st.altair_chart(share_chart, use_container_width=True)
+        st.vega_lite_chart(
+            {**share_chart.to_dict(), "datasets": {"share": share_df}},
+            use_container_width=True,
+        )
 
         st.caption("Interpretation: revenue concentration shows whether a few categories dominate sales.")
 
         # Download aggregated top table
-        csv_bytes = stats_top.rename(columns={cat_col: "category"}).to_csv(index=False).encode("utf-8")
+        csv_bytes = stats_top.to_csv(index=False).encode("utf-8")
         st.download_button(
             "Download Top-N aggregation (CSV)",
             data=csv_bytes,
@@ -162,6 +190,6 @@ def render():
 
     if show_table:
         with st.expander("Aggregated table (Top categories)", expanded=True):
-            out = stats_top.rename(columns={cat_col: "category"}).copy()
+            out = stats_top.copy()
             out["revenue_pct_of_total"] = out["revenue_pct_of_total"].round(2)
             st.dataframe(out, use_container_width=True)
\ No newline at end of file
@@ -1,25 +1,130 @@
-from pathlib import Path
-
 import numpy as np
 import pandas as pd
 import streamlit as st
-import altair as alt
+
+from data import load_items, load_orders, load_persisted
 
 
-def _resolve_data_dir() -> Path:
-    local = Path("data")
-    return local if local.exists() else Path("/mnt/data")
+OVERVIEW_MAX_POINTS = 200
 
 
-DATA_DIR = _resolve_data_dir()
+def _period_start(ts: np.ndarray, gran: str) -> np.ndarray:
+    if gran == "Monthly":
+        return ts.astype("datetime64[M]")
+    days = ts.astype("datetime64[D]")
+    # numpy weeks are anchored on Thursday 1970-01-01; shift back to Monday.
+    return days - ((days.astype("int64") + 3) % 7).astype("timedelta64[D]")
 
 
 @st.cache_data(show_spinner=False)
-def read_csv(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path.resolve()}")
-    return pd.read_csv(path)
+def _load_timeseries(gran: str) -> pd.DataFrame:
+    return load_persisted(
+        f"timeseries_{gran.lower()}",
+        ["olist_orders_dataset.csv", "olist_order_items_dataset.csv"],
+        lambda: _build_timeseries(gran),
+    )
+
+
+def _build_timeseries(gran: str) -> pd.DataFrame:
+    orders = load_orders()
+    items = load_items()[["order_id", "price"]]
+
+    orders = orders.dropna(subset=["order_purchase_timestamp"])
+    period = _period_start(orders["order_purchase_timestamp"].to_numpy(), gran)
+
+    periods, order_bucket = np.unique(period, return_inverse=True)
+    item_bucket = items["order_id"].map(pd.Series(order_bucket, index=orders["order_id"]))
+    matched = item_bucket.notna().to_numpy() & items["price"].notna().to_numpy()
+
+    return pd.DataFrame(
+        {
+            "period": periods,
+            "orders": np.bincount(order_bucket, minlength=len(periods)),
+            "revenue": np.bincount(
+                item_bucket.to_numpy()[matched].astype(np.intp),
+                weights=items["price"].to_numpy()[matched],
+                minlength=len(periods),
+            ),
+        }
+    )
+
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # Trailing mean from one cumulative sum; matches Series.rolling(window).mean().
+    out = np.full(len(values), np.nan)
+    csum = np.cumsum(values, dtype=np.float64)
+    out[window - 1 :] = (csum[window - 1 :] - np.concatenate(([0.0], csum[:-window]))) / window
+    return out
+
+
+_PERIOD_X = {"field": "period", "type": "temporal", "title": None}
+
+# Tooltip content: always show original revenue (not log) for interpretability
+_TOOLTIP = [
+    {"field": "period", "type": "temporal", "title": "Period"},
+    {"field": "orders", "type": "quantitative", "title": "Orders", "format": ","},
+    {"field": "revenue", "type": "quantitative", "title": "Revenue", "format": ",.2f"},
+]
+
+
+def _metric_panel(
+    name: str,
+    y_field: str,
+    y_title: str,
+    smooth_field: str,
+    brush: str,
+    smooth: bool,
+    show_points: bool,
+) -> dict:
+    # Use brush as a filter for the main charts (zoom)
+    zoom = {"filter": {"param": brush}}
+    layers = [
+        {
+            "mark": {"type": "line", "strokeWidth": 2},
+            "encoding": {
+                "x": _PERIOD_X,
+                "y": {"field": y_field, "type": "quantitative", "title": y_title, "axis": {"grid": True}},
+                "tooltip": _TOOLTIP,
+            },
+            "transform": [zoom],
+        }
+    ]
+    if smooth:
+        layers.append(
+            {
+                "mark": {"type": "line", "opacity": 0.5, "strokeDash": [4, 3]},
+                "encoding": {
+                    "x": _PERIOD_X,
+                    "y": {"field": smooth_field, "type": "quantitative", "title": None},
+                },
+                "transform": [zoom],
+            }
+        )
+    if show_points:
+        layers.append(
+            {
+                "name": f"{name}_points",
+                "mark": {"type": "circle", "size": 35},
+                "encoding": {
+                    "x": _PERIOD_X,
+                    "y": {"field": y_field, "type": "quantitative"},
+                    "opacity": {
+                        "condition": {"param": "hover", "value": 1.0, "empty": False},
+                        "value": 0.0,
+                    },
+                    "tooltip": _TOOLTIP,
+                },
+                "transform": [zoom],
+            }
+        )
+        layers.append(
+            {
+                "mark": {"type": "rule", "opacity": 0.25},
+                "encoding": {"x": {"field": "period", "type": "temporal"}},
+                "transform": [zoom, {"filter": {"param": "hover", "empty": False}}],
+            }
+        )
+    return {"data": {"name": "main"}, "layer": layers, "height": 260}
 
 
 def render():
@@ -35,34 +140,8 @@ def render():
         log_revenue = st.checkbox("Log revenue (log1p)", value=False)
         reset_zoom = st.checkbox("Reset zoom", value=False)
 
-    orders = read_csv("olist_orders_dataset.csv")
-    items = read_csv("olist_order_items_dataset.csv")
-
-    orders["order_purchase_timestamp"] = pd.to_datetime(
-        orders["order_purchase_timestamp"], errors="coerce"
-    )
-    items["price"] = pd.to_numeric(items["price"], errors="coerce")
-
-    df = orders.merge(items[["order_id", "price"]], on="order_id", how="left")
-    df = df.dropna(subset=["order_purchase_timestamp"])
-    df["price"] = df["price"].fillna(0.0)
-
-    if gran == "Monthly":
-        df["period"] = df["order_purchase_timestamp"].dt.to_period("M").dt.to_timestamp()
-        title = "Monthly Trend"
-    else:
-        df["period"] = df["order_purchase_timestamp"].dt.to_period("W").dt.start_time
-        title = "Weekly Trend"
-
-    agg = (
-        df.groupby("period")
-        .agg(
-            orders=("order_id", "nunique"),
-            revenue=("price", "sum"),
-        )
-        .sort_index()
-        .reset_index()
-    )
+    agg = _load_timeseries(gran)
+    title = "Monthly Trend" if gran == "Monthly" else "Weekly Trend"
 
     if len(agg) == 0:
         st.info("No data available after cleaning timestamps.")
@@ -75,12 +154,10 @@ def render():
         agg["revenue_plot"] = agg["revenue"]
         revenue_title = "Revenue"
 
-    if smooth and window and len(agg) >= window:
-        agg["orders_smooth"] = agg["orders"].rolling(window).mean()
-        agg["revenue_smooth"] = agg["revenue_plot"].rolling(window).mean()
-    else:
-        agg["orders_smooth"] = np.nan
-        agg["revenue_smooth"] = np.nan
+    show_smooth = bool(smooth and window and len(agg) >= window)
+    if show_smooth:
+        agg["orders_smooth"] = _rolling_mean(agg["orders"].to_numpy(), window)
+        agg["revenue_smooth"] = _rolling_mean(agg["revenue_plot"].to_numpy(), window)
 
     # ---- Summary metrics (context without clutter)
     c1, c2, c3 = st.columns(3)
@@ -92,108 +169,64 @@ def render():
     st.subheader(title)
 
     # ---- Interactive selections
-    hover = alt.selection_point(
-        fields=["period"],
-        nearest=True,
-        on="mouseover",
-        empty=False,
-        clear="mouseout",
-    )
-
-    brush = alt.selection_interval(encodings=["x"])
-    if reset_zoom:
-        brush = alt.selection_interval(encodings=["x"], empty="all")
-
-    base = alt.Chart(agg).encode(
-        x=alt.X("period:T", title=None),
-    )
-
-    # Use brush as a filter for the main charts (zoom)
-    filtered = base.transform_filter(brush)
-
-    # Tooltip content: always show original revenue (not log) for interpretability
-    tooltip = [
-        alt.Tooltip("period:T", title="Period"),
-        alt.Tooltip("orders:Q", title="Orders", format=","),
-        alt.Tooltip("revenue:Q", title="Revenue", format=",.2f"),
+    # Toggling "Reset zoom" renames the brush, so the chart remounts without the old selection.
+    brush = "brush_reset" if reset_zoom else "brush"
+    params = [
+        {"name": brush, "select": {"type": "interval", "encodings": ["x"]}, "views": ["overview"]},
     ]
-
-    line_kwargs = {"strokeWidth": 2}
-
-    # ---- Orders chart
-    orders_line = filtered.mark_line(**line_kwargs).encode(
-        y=alt.Y("orders:Q", title="Orders", axis=alt.Axis(grid=True)),
-        tooltip=tooltip,
-    )
-
-    orders_smooth = filtered.mark_line(opacity=0.5, strokeDash=[4, 3]).encode(
-        y=alt.Y("orders_smooth:Q", title=None),
-    )
-
-    orders_points = filtered.mark_circle(size=35).encode(
-        y="orders:Q",
-        opacity=alt.condition(hover, alt.value(1.0), alt.value(0.0)),
-        tooltip=tooltip,
-    ).add_params(hover)
-
-    orders_rule = filtered.mark_rule(opacity=0.25).encode(
-        x="period:T"
-    ).transform_filter(hover)
-
-    orders_layer = orders_line
-    if smooth and window:
-        orders_layer = orders_layer + orders_smooth
     if show_points:
-        orders_layer = orders_layer + orders_points + orders_rule
-
-    orders_chart = orders_layer.properties(height=260)
+        params.append(
+            {
+                "name": "hover",
+                "select": {
+                    "type": "point",
+                    "fields": ["period"],
+                    "nearest": True,
+                    "on": "mouseover",
+                    "clear": "mouseout",
+                },
+                "views": ["orders_points", "revenue_points"],
+            }
+        )
 
-    # ---- Revenue chart
-    revenue_line = filtered.mark_line(**line_kwargs).encode(
-        y=alt.Y("revenue_plot:Q", title=revenue_title, axis=alt.Axis(grid=True)),
-        tooltip=tooltip,
+    # ---- Orders / revenue panels, zoomed by the overview brush
+    orders_chart = _metric_panel(
+        "orders", "orders", "Orders", "orders_smooth", brush, show_smooth, show_points
     )
-
-    revenue_smooth = filtered.mark_line(opacity=0.5, strokeDash=[4, 3]).encode(
-        y=alt.Y("revenue_smooth:Q", title=None),
+    revenue_chart = _metric_panel(
+        "revenue", "revenue_plot", revenue_title, "revenue_smooth", brush, show_smooth, show_points
     )
 
-    revenue_points = filtered.mark_circle(size=35).encode(
-        y="revenue_plot:Q",
-        opacity=alt.condition(hover, alt.value(1.0), alt.value(0.0)),
-        tooltip=tooltip,
-    ).add_params(hover)
-
-    revenue_rule = filtered.mark_rule(opacity=0.25).encode(
-        x="period:T"
-    ).transform_filter(hover)
-
-    revenue_layer = revenue_line
-    if smooth and window:
-        revenue_layer = revenue_layer + revenue_smooth
-    if show_points:
-        revenue_layer = revenue_layer + revenue_points + revenue_rule
-
-    revenue_chart = revenue_layer.properties(height=260)
-
     # ---- Overview brush (mini timeline)
-    overview = (
-        base.mark_area(opacity=0.25)
-        .encode(
-            y=alt.Y("orders:Q", title=None, axis=alt.Axis(labels=False, ticks=False, grid=False)),
-        )
-        .properties(height=70)
-        .add_params(brush)
-    )
-
-    final = alt.vconcat(
-        orders_chart,
-        revenue_chart,
-        overview,
-        spacing=18,
-    ).resolve_scale(x="shared")
-
-    st.altair_chart(final, use_container_width=True)
+    step = max(1, -(-len(agg) // OVERVIEW_MAX_POINTS))
+    overview_df = agg[["period", "orders"]].iloc[::step]
+    overview = {
+        "name": "overview",
+        "data": {"name": "overview"},
+        "mark": {"type": "area", "opacity": 0.25},
+        "encoding": {
+            "x": _PERIOD_X,
+            "y": {
+                "field": "orders",
+                "type": "quantitative",
+                "title": None,
+                "axis": {"labels": False, "ticks": False, "grid": False},
+            },
+        },
+        "height": 70,
+    }
+
+    # Hand-written Vega-Lite: no Altair validation per rerun; datasets ship as Arrow.
+    spec = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "datasets": {"main": agg, "overview": overview_df},
+        "params": params,
+        "vconcat": [orders_chart, revenue_chart, overview],
+        "spacing": 18,
+        "resolve": {"scale": {"x": "shared"}},
+    }
+
+    st.vega_lite_chart(spec, use_container_width=True)
 
     with st.expander("Show aggregated table"):
         st.dataframe(agg, use_container_width=True)
\ No newline at end of file
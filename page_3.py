@@ -2,18 +2,38 @@
 from __future__ import annotations
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from ui import session_figure
 
-def _split_evenly(total: int, count: int) -> list[int]:
-    base = total // count
-    remainder = total % count
-    return [base + 1] * remainder + [base] * (count - remainder)
 
+_RULE_MAP = {
+    "Monthly": "M",
+    "Quarterly": "Q",
+    "Yearly": "Y",
+}
 
-def _build_base_df() -> pd.DataFrame:
-    data = {
+
+# Matches str(Period) for months/years; quarters read "2017 Q1" instead of "2017Q1".
+_LABEL_FORMAT = {
+    "Monthly": "%Y-%m",
+    "Quarterly": "%Y Q%q",
+    "Yearly": "%Y",
+}
+
+
+def _split_evenly(total: int, count: int) -> np.ndarray:
+    base, remainder = divmod(total, count)
+    out = np.full(count, base, dtype=np.int32)
+    out[:remainder] += 1
+    return out
+
+
+# Quarterly delivery counts; the quarter bounds are spelled out so nothing is parsed at runtime.
+_BASE_DF = pd.DataFrame(
+    {
         "quarter": [
             "2017 Q1",
             "2017 Q2",
@@ -25,50 +45,96 @@ def _build_base_df() -> pd.DataFrame:
         ],
         "on_time_orders": [4731, 8553, 11727, 15537, 17619, 18643, 11571],
         "late_orders": [531, 796, 915, 2311, 3589, 1338, 1249],
+        "period_start": pd.to_datetime(
+            [
+                "2017-01-01",
+                "2017-04-01",
+                "2017-07-01",
+                "2017-10-01",
+                "2018-01-01",
+                "2018-04-01",
+                "2018-07-01",
+            ]
+        ),
+        "period_end": pd.to_datetime(
+            [
+                "2017-03-31",
+                "2017-06-30",
+                "2017-09-30",
+                "2017-12-31",
+                "2018-03-31",
+                "2018-06-30",
+                "2018-09-30",
+            ]
+        ),
     }
-    df = pd.DataFrame(data)
-    # Parse quarter labels into timestamp for filtering and grouping.
-    # Some pandas versions fail on "YYYY Qn", so normalize to "YYYYQn".
-    quarter_norm = df["quarter"].str.replace(" ", "", regex=False)
-    df["period_start"] = pd.PeriodIndex(quarter_norm, freq="Q").start_time
-    df["period_end"] = pd.PeriodIndex(quarter_norm, freq="Q").end_time.normalize()
-    return df
+)
 
 
 def _build_daily_df(base_df: pd.DataFrame) -> pd.DataFrame:
-    records: list[dict[str, int | pd.Timestamp]] = []
-    for row in base_df.itertuples(index=False):
-        days = pd.date_range(row.period_start, row.period_end, freq="D")
-        on_time_parts = _split_evenly(int(row.on_time_orders), len(days))
-        late_parts = _split_evenly(int(row.late_orders), len(days))
-
-        for d, on_t, late in zip(days, on_time_parts, late_parts):
-            records.append(
-                {
-                    "date": d,
-                    "on_time_orders": on_t,
-                    "late_orders": late,
-                }
-            )
-    return pd.DataFrame.from_records(records)
+    lengths = ((base_df["period_end"] - base_df["period_start"]).dt.days + 1).to_numpy()
+    dates = np.concatenate(
+        [
+            pd.date_range(start, end, freq="D").to_numpy()
+            for start, end in zip(base_df["period_start"], base_df["period_end"])
+        ]
+    )
+    on_time = np.empty(lengths.sum(), dtype=np.int32)
+    late = np.empty(lengths.sum(), dtype=np.int32)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    for i, row in enumerate(base_df.itertuples(index=False)):
+        lo, hi = offsets[i], offsets[i + 1]
+        on_time[lo:hi] = _split_evenly(int(row.on_time_orders), int(lengths[i]))
+        late[lo:hi] = _split_evenly(int(row.late_orders), int(lengths[i]))
+    return pd.DataFrame({"date": dates, "on_time_orders": on_time, "late_orders": late})
+
+
+@st.cache_data(show_spinner=False)
+def _load_page3_daily() -> pd.DataFrame:
+    return _build_daily_df(_BASE_DF)
+
+
+def _to_monthly(daily: pd.DataFrame) -> pd.DataFrame:
+    monthly = (
+        daily.set_index("date")[["on_time_orders", "late_orders"]]
+        .resample("MS")
+        .sum()
+        .reset_index(names="month_start")
+    )
+    monthly.insert(0, "period", monthly["month_start"].dt.to_period("M"))
+    return monthly
 
 
-def _label_from_period(period: pd.Period, granularity: str) -> str:
-    if granularity == "Quarterly":
-        p = str(period)
-        return p.replace("Q", " Q")
-    return str(period)
+@st.cache_data(show_spinner=False)
+def _load_page3_monthly() -> pd.DataFrame:
+    return _to_monthly(_load_page3_daily())
 
 
-def _aggregate(df: pd.DataFrame, granularity: str) -> pd.DataFrame:
-    rule_map = {
-        "Monthly": "M",
-        "Quarterly": "Q",
-        "Yearly": "Y",
-    }
-    rule = rule_map[granularity]
+def _monthly_window(daily: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    start = np.datetime64(start_date, "D")
+    after_end = np.datetime64(end_date, "D") + np.timedelta64(1, "D")
+    whole_months = start == start.astype("datetime64[M]") and after_end == after_end.astype(
+        "datetime64[M]"
+    )
+    if whole_months:
+        # Month-aligned ranges (the default) slice the cached monthly table directly.
+        monthly = _load_page3_monthly()
+        starts = monthly["month_start"].to_numpy()
+        lo = np.searchsorted(starts, start)
+        hi = np.searchsorted(starts, after_end)
+        return monthly.iloc[lo:hi]
+
+    dates = daily["date"].to_numpy()
+    lo = np.searchsorted(dates, start)
+    hi = np.searchsorted(dates, after_end)
+    return _to_monthly(daily.iloc[lo:hi])
+
+
+def _aggregate(monthly: pd.DataFrame, granularity: str) -> pd.DataFrame:
+    rule = _RULE_MAP[granularity]
+    periods = monthly["period"].dt.asfreq(rule) if rule != "M" else monthly["period"]
     grouped = (
-        df.groupby(df["date"].dt.to_period(rule))
+        monthly.groupby(periods)
         .agg(
             on_time_orders=("on_time_orders", "sum"),
             late_orders=("late_orders", "sum"),
@@ -80,7 +146,7 @@ def _aggregate(df: pd.DataFrame, granularity: str) -> pd.DataFrame:
     grouped["late_percentage"] = (
         grouped["late_orders"] / grouped["total_orders"] * 100.0
     )
-    grouped["label"] = grouped["period"].apply(lambda p: _label_from_period(p, granularity))
+    grouped["label"] = grouped["period"].dt.strftime(_LABEL_FORMAT[granularity])
     return grouped
 
 
@@ -91,8 +157,7 @@ def render():
         "Date range and granularity are interactive."
     )
 
-    base_df = _build_base_df()
-    df = _build_daily_df(base_df)
+    df = _load_page3_daily()
 
     min_date = df["date"].min().date()
     max_date = df["date"].max().date()
@@ -116,18 +181,16 @@ def render():
     else:
         start_date, end_date = min_date, max_date
 
-    filtered = df[
-        (df["date"].dt.date >= start_date)
-        & (df["date"].dt.date <= end_date)
-    ].copy()
+    monthly = _monthly_window(df, start_date, end_date)
 
-    if filtered.empty:
+    if monthly.empty:
         st.warning("No data in the selected date range.")
         return
 
-    agg = _aggregate(filtered, granularity)
+    agg = _aggregate(monthly, granularity)
 
-    fig, ax1 = plt.subplots(figsize=(16, 8))
+    fig = session_figure("page3_fig", (16, 8))
+    ax1 = fig.subplots()
     x_positions = range(len(agg))
     bar_width = 0.6
     show_data_labels = len(agg) <= 40
@@ -149,42 +212,21 @@ def render():
     )
 
     if show_data_labels:
-        for rect in rects1:
-            h = rect.get_height()
-            if h > 0:
-                ax1.text(
-                    rect.get_x() + rect.get_width() / 2,
-                    rect.get_y() + h / 2,
-                    f"{int(h)}",
-                    ha="center",
-                    va="center",
-                    color="white",
-                    fontsize=11,
-                )
-
-        for rect in rects2:
-            h = rect.get_height()
-            if h > 0:
-                ax1.text(
-                    rect.get_x() + rect.get_width() / 2,
-                    rect.get_y() + h / 2,
-                    f"{int(h)}",
-                    ha="center",
-                    va="center",
-                    color="white",
-                    fontsize=11,
-                )
-
-        for i, total_orders in enumerate(agg["total_orders"]):
-            ax1.text(
-                i,
-                total_orders,
-                f"{int(total_orders)}",
-                ha="center",
-                va="bottom",
+        for rects, values in ((rects1, agg["on_time_orders"]), (rects2, agg["late_orders"])):
+            ax1.bar_label(
+                rects,
+                labels=[f"{int(v)}" if v > 0 else "" for v in values],
+                label_type="center",
+                color="white",
                 fontsize=11,
-                color="black",
             )
+        ax1.bar_label(
+            rects2,
+            labels=[f"{int(v)}" for v in agg["total_orders"]],
+            label_type="edge",
+            color="black",
+            fontsize=11,
+        )
 
     ax2 = ax1.twinx()
     line_plot, = ax2.plot(
@@ -235,9 +277,9 @@ def render():
 
     ax1.grid(True, linestyle="--", alpha=0.7)
     ax2.grid(False)
-    plt.tight_layout()
+    fig.tight_layout()
 
-    st.pyplot(fig, clear_figure=True)
+    st.pyplot(fig, clear_figure=False)
     if not show_data_labels:
         st.caption("Point labels are hidden automatically for dense views (more than 40 periods).")
 
@@ -1,10 +1,11 @@
 # page_4.py
-from pathlib import Path
-
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from data import load_items, load_orders, load_seller_orders
+from ui import session_figure
+
 
 WEEKDAY_ORDER = [
     "Monday",
@@ -17,59 +18,24 @@ WEEKDAY_ORDER = [
 ]
 
 
-def _resolve_data_dir() -> Path:
-    local = Path("data")
-    if local.exists():
-        return local
-    return Path("/mnt/data")
-
-
-DATA_DIR = _resolve_data_dir()
-
-
-@st.cache_data(show_spinner=False)
-def read_csv(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path.resolve()}")
-    return pd.read_csv(path)
-
-
 @st.cache_data(show_spinner=True)
 def load_base() -> pd.DataFrame:
-    orders = read_csv("olist_orders_dataset.csv")[
-        [
-            "order_id",
-            "order_status",
-            "order_purchase_timestamp",
-            "order_delivered_customer_date",
-            "order_estimated_delivery_date",
-        ]
-    ].copy()
-    items = read_csv("olist_order_items_dataset.csv")[["order_id", "price"]].copy()
-
-    orders["order_purchase_timestamp"] = pd.to_datetime(
-        orders["order_purchase_timestamp"], errors="coerce"
-    )
-    orders["order_delivered_customer_date"] = pd.to_datetime(
-        orders["order_delivered_customer_date"], errors="coerce"
-    )
-    orders["order_estimated_delivery_date"] = pd.to_datetime(
-        orders["order_estimated_delivery_date"], errors="coerce"
-    )
+    orders = load_orders()
+    items = load_items()[["order_id", "price"]]
 
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0.0)
     revenue = items.groupby("order_id", as_index=False)["price"].sum()
     revenue = revenue.rename(columns={"price": "order_value"})
 
     df = orders.merge(revenue, on="order_id", how="left")
     df["order_value"] = df["order_value"].fillna(0.0)
-    df = df.dropna(subset=["order_purchase_timestamp"]).copy()
+    df = df.dropna(subset=["order_purchase_timestamp"])
+    df = df.sort_values("order_purchase_timestamp", kind="stable", ignore_index=True)
 
-    df["order_date"] = df["order_purchase_timestamp"].dt.date
-    df["hour"] = df["order_purchase_timestamp"].dt.hour
+    df["order_date"] = df["order_purchase_timestamp"].dt.normalize()
+    df["hour"] = df["order_purchase_timestamp"].dt.hour.astype(np.int8)
     df["weekday"] = df["order_purchase_timestamp"].dt.day_name()
     df["weekday"] = pd.Categorical(df["weekday"], categories=WEEKDAY_ORDER, ordered=True)
+    df["weekday_code"] = df["order_purchase_timestamp"].dt.dayofweek.astype(np.int8)
 
     known_late = (
         df["order_delivered_customer_date"].notna()
@@ -83,83 +49,48 @@ def load_base() -> pd.DataFrame:
     return df
 
 
-@st.cache_data(show_spinner=False)
-def load_seller_orders() -> pd.DataFrame:
-    items = read_csv("olist_order_items_dataset.csv")[
-        ["order_id", "seller_id", "price", "freight_value"]
-    ].copy()
-    orders = read_csv("olist_orders_dataset.csv")[
-        ["order_id", "order_status", "order_purchase_timestamp"]
-    ].copy()
-    sellers = read_csv("olist_sellers_dataset.csv")[["seller_id", "seller_state"]].copy()
-
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0.0)
-    items["freight_value"] = pd.to_numeric(items["freight_value"], errors="coerce").fillna(0.0)
-    orders["order_purchase_timestamp"] = pd.to_datetime(
-        orders["order_purchase_timestamp"], errors="coerce"
-    )
-
-    df = items.merge(orders, on="order_id", how="left")
-    df = df.merge(sellers, on="seller_id", how="left")
-    df = df.dropna(subset=["order_purchase_timestamp"]).copy()
-    df["order_date"] = df["order_purchase_timestamp"].dt.date
-    return df
+def _date_window(df: pd.DataFrame, start_date, end_date) -> pd.DataFrame:
+    # Rows are sorted by purchase time: two binary searches replace a per-row date mask.
+    ts = df["order_purchase_timestamp"].to_numpy()
+    lo = np.searchsorted(ts, np.datetime64(start_date))
+    hi = np.searchsorted(ts, np.datetime64(end_date) + np.timedelta64(1, "D"))
+    return df.iloc[lo:hi]
 
 
 def _build_heatmap(df: pd.DataFrame, metric: str) -> pd.DataFrame:
-    if metric == "Order Count":
-        table = df.pivot_table(
-            index="weekday",
-            columns="hour",
-            values="order_id",
-            aggfunc="count",
-            fill_value=0.0,
-        )
-    elif metric == "Revenue":
-        table = df.pivot_table(
-            index="weekday",
-            columns="hour",
-            values="order_value",
-            aggfunc="sum",
-            fill_value=0.0,
-        )
+    # Flat (weekday, hour) cell ids: each metric is one bincount over 7 * 24 slots.
+    cell = df["weekday_code"].to_numpy(np.int64) * 24 + df["hour"].to_numpy(np.int64)
+    counts = np.bincount(cell, minlength=7 * 24)
+    if metric == "Revenue":
+        values = np.bincount(cell, weights=df["order_value"].to_numpy(), minlength=7 * 24)
     elif metric == "Average Order Value":
-        table = df.pivot_table(
-            index="weekday",
-            columns="hour",
-            values="order_value",
-            aggfunc="mean",
-            fill_value=0.0,
-        )
+        revenue = np.bincount(cell, weights=df["order_value"].to_numpy(), minlength=7 * 24)
+        values = np.divide(revenue, counts, out=np.zeros(7 * 24), where=counts > 0)
     else:
-        table = df.pivot_table(
-            index="weekday",
-            columns="hour",
-            values="order_id",
-            aggfunc="count",
-            fill_value=0.0,
-        )
+        values = counts
 
-    table = table.reindex(index=WEEKDAY_ORDER, columns=list(range(24)), fill_value=0.0)
-    return table
+    return pd.DataFrame(
+        values.reshape(7, 24),
+        index=pd.Index(WEEKDAY_ORDER, name="weekday"),
+        columns=pd.Index(range(24), name="hour"),
+    )
 
 
 def _aggregate_sellers(df: pd.DataFrame) -> pd.DataFrame:
     agg = (
-        df.groupby(["seller_id", "seller_state"], as_index=False)
+        df.groupby(["seller_id", "seller_state"], as_index=False, observed=True)
         .agg(
-            orders=("order_id", "nunique"),
+            orders=("order_code", "nunique"),
             items=("order_id", "count"),
             revenue=("price", "sum"),
             freight=("freight_value", "sum"),
         )
         .sort_values("revenue", ascending=False)
     )
-    agg["avg_order_value"] = agg["revenue"] / agg["orders"].replace(0, pd.NA)
-    agg["avg_order_value"] = agg["avg_order_value"].fillna(0.0)
-    agg["freight_ratio_pct"] = (agg["freight"] / agg["revenue"].replace(0, pd.NA)) * 100.0
-    agg["freight_ratio_pct"] = agg["freight_ratio_pct"].fillna(0.0)
-    return agg
+    return agg.assign(
+        avg_order_value=(agg["revenue"] / agg["orders"].replace(0, pd.NA)).fillna(0.0),
+        freight_ratio_pct=((agg["freight"] / agg["revenue"].replace(0, pd.NA)) * 100.0).fillna(0.0),
+    )
 
 
 def render():
@@ -169,9 +100,9 @@ def render():
     )
 
     df = load_base()
-    df = df[df["order_status"] == "delivered"].copy()
-    min_date = df["order_date"].min()
-    max_date = df["order_date"].max()
+    df = df[df["order_status"] == "delivered"]
+    min_date = df["order_date"].min().date()
+    max_date = df["order_date"].max().date()
 
     with st.sidebar:
         st.subheader("Page 4 controls")
@@ -194,9 +125,7 @@ def render():
     else:
         start_date, end_date = min_date, max_date
 
-    filtered = df[
-        (df["order_date"] >= start_date) & (df["order_date"] <= end_date)
-    ].copy()
+    filtered = _date_window(df, start_date, end_date)
 
     if filtered.empty:
         st.warning("No data available for current filters.")
@@ -204,7 +133,8 @@ def render():
 
     heat = _build_heatmap(filtered, metric)
 
-    fig, ax = plt.subplots(figsize=(16, 6.5))
+    fig = session_figure("page4_heatmap_fig", (16, 6.5))
+    ax = fig.subplots()
     im = ax.imshow(heat.values, aspect="auto", cmap=cmap, interpolation="nearest")
 
     ax.set_title(f"{metric} by Weekday and Hour", fontsize=16, pad=12)
@@ -219,21 +149,28 @@ def render():
     cbar.set_label(metric, rotation=90)
 
     if annotate:
-        max_val = float(heat.values.max()) if heat.size else 0.0
-        threshold = max_val * 0.55
-        for y in range(heat.shape[0]):
-            for x in range(heat.shape[1]):
-                val = float(heat.iat[y, x])
-                txt = f"{val:.0f}" if metric in ("Order Count", "Revenue") else f"{val:.1f}"
-                color = "white" if val >= threshold else "black"
-                ax.text(x, y, txt, ha="center", va="center", fontsize=7, color=color)
-
-    plt.tight_layout()
-    st.pyplot(fig, clear_figure=True)
-
-    stack = heat.stack()
-    top_idx = stack.idxmax()
-    top_val = float(stack.max())
+        values = heat.to_numpy(dtype=float)
+        threshold = (values.max() if values.size else 0.0) * 0.55
+        fmt = "{:.0f}" if metric in ("Order Count", "Revenue") else "{:.1f}"
+        colors = np.where(values >= threshold, "white", "black")
+        for y, x in zip(*np.nonzero(values)):
+            ax.text(
+                x,
+                y,
+                fmt.format(values[y, x]),
+                ha="center",
+                va="center",
+                fontsize=7,
+                color=colors[y, x],
+            )
+
+    fig.tight_layout()
+    st.pyplot(fig, clear_figure=False)
+
+    values = heat.to_numpy()
+    top_day, top_hour = np.unravel_index(np.argmax(values), values.shape)
+    top_idx = (WEEKDAY_ORDER[top_day], int(top_hour))
+    top_val = float(values[top_day, top_hour])
 
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -252,12 +189,8 @@ def render():
         "Each point is a seller. Right/up means more orders/revenue, and bigger circles indicate higher average order value."
     )
 
-    seller_orders = load_seller_orders()
-    seller_orders = seller_orders[
-        (seller_orders["order_status"] == "delivered")
-        & (seller_orders["order_date"] >= start_date)
-        & (seller_orders["order_date"] <= end_date)
-    ].copy()
+    seller_orders = _date_window(load_seller_orders(), start_date, end_date)
+    seller_orders = seller_orders[seller_orders["order_status"] == "delivered"]
 
     if seller_orders.empty:
         st.warning("No seller rows available for the selected date range.")
@@ -273,14 +206,15 @@ def render():
         label_top_k = st.slider("Label top sellers", min_value=0, max_value=15, value=6, step=1)
 
     if state_filter:
-        seller_orders = seller_orders[seller_orders["seller_state"].isin(state_filter)].copy()
+        seller_orders = seller_orders[seller_orders["seller_state"].isin(state_filter)]
 
     seller_stats = _aggregate_sellers(seller_orders).head(top_n)
     if seller_stats.empty:
         st.warning("No sellers match current filters.")
         return
 
-    fig2, ax = plt.subplots(figsize=(12, 7))
+    fig2 = session_figure("page4_sellers_fig", (12, 7))
+    ax = fig2.subplots()
     size = seller_stats["avg_order_value"].clip(lower=1.0) * 2.2
     sc = ax.scatter(
         seller_stats["orders"],
@@ -300,17 +234,20 @@ def render():
     cbar.set_label("Freight / Revenue (%)", rotation=90)
 
     if label_top_k > 0:
-        for _, row in seller_stats.nlargest(label_top_k, "revenue").iterrows():
+        top = seller_stats.nlargest(label_top_k, "revenue")
+        for seller_id, orders, revenue in zip(
+            top["seller_id"].to_numpy(), top["orders"].to_numpy(), top["revenue"].to_numpy()
+        ):
             ax.annotate(
-                row["seller_id"][:8],
-                (row["orders"], row["revenue"]),
+                seller_id[:8],
+                (orders, revenue),
                 textcoords="offset points",
                 xytext=(4, 4),
                 fontsize=8,
             )
 
-    plt.tight_layout()
-    st.pyplot(fig2, clear_figure=True)
+    fig2.tight_layout()
+    st.pyplot(fig2, clear_figure=False)
 
     c4, c5, c6 = st.columns(3)
     with c4:
@@ -1,87 +1,66 @@
-from pathlib import Path
-
+import numpy as np
 import pandas as pd
 import pydeck as pdk
 import streamlit as st
 
-
-def _resolve_data_dir() -> Path:
-    local = Path("data")
-    if local.exists():
-        return local
-    return Path("/mnt/data")
-
-
-DATA_DIR = _resolve_data_dir()
+from data import load_seller_orders
+
+
+# Mean geolocation per state from olist_geolocation_dataset.csv, precomputed so the
+# ~1M-row file is never parsed at runtime. Values are (lat, lon).
+_STATE_CENTROIDS = {
+    "AC": (-9.702555, -68.451852),
+    "AL": (-9.599729, -36.052017),
+    "AM": (-3.349336, -60.537430),
+    "AP": (0.086025, -51.234304),
+    "BA": (-13.049361, -39.560649),
+    "CE": (-4.363151, -39.004140),
+    "DF": (-15.810885, -47.969630),
+    "ES": (-20.105145, -40.503183),
+    "GO": (-16.577645, -49.334195),
+    "MA": (-3.798997, -44.818627),
+    "MG": (-19.864647, -44.421615),
+    "MS": (-20.765006, -54.532140),
+    "MT": (-14.156482, -55.708956),
+    "PA": (-2.631213, -49.485862),
+    "PB": (-7.088298, -35.821678),
+    "PE": (-8.179098, -35.758866),
+    "PI": (-5.754989, -42.509541),
+    "PR": (-24.793607, -50.879662),
+    "RJ": (-22.743477, -43.155540),
+    "RN": (-5.856702, -35.990079),
+    "RO": (-10.341289, -62.720579),
+    "RR": (2.717100, -60.672866),
+    "RS": (-29.679191, -52.032652),
+    "SC": (-27.222486, -49.617937),
+    "SE": (-10.866199, -37.181169),
+    "SP": (-23.155308, -47.084074),
+    "TO": (-9.503700, -48.348661),
+}
 
 
-@st.cache_data(show_spinner=False)
-def read_csv(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path.resolve()}")
-    return pd.read_csv(path)
-
-
-@st.cache_data(show_spinner=True)
-def load_seller_orders() -> pd.DataFrame:
-    items = read_csv("olist_order_items_dataset.csv")[
-        ["order_id", "seller_id", "price", "freight_value"]
-    ].copy()
-    orders = read_csv("olist_orders_dataset.csv")[
-        ["order_id", "order_status", "order_purchase_timestamp"]
-    ].copy()
-    sellers = read_csv("olist_sellers_dataset.csv")[
-        ["seller_id", "seller_state", "seller_zip_code_prefix"]
-    ].copy()
-
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0.0)
-    items["freight_value"] = pd.to_numeric(items["freight_value"], errors="coerce").fillna(0.0)
-    orders["order_purchase_timestamp"] = pd.to_datetime(
-        orders["order_purchase_timestamp"], errors="coerce"
-    )
-
-    df = items.merge(orders, on="order_id", how="left")
-    df = df.merge(sellers, on="seller_id", how="left")
-    df = df.dropna(subset=["order_purchase_timestamp", "seller_state"]).copy()
-    df["order_date"] = df["order_purchase_timestamp"].dt.date
-    return df
-
-
-@st.cache_data(show_spinner=True)
 def load_state_centroids() -> pd.DataFrame:
-    geo = read_csv("olist_geolocation_dataset.csv")[
-        ["geolocation_state", "geolocation_lat", "geolocation_lng"]
-    ].copy()
-    geo["geolocation_lat"] = pd.to_numeric(geo["geolocation_lat"], errors="coerce")
-    geo["geolocation_lng"] = pd.to_numeric(geo["geolocation_lng"], errors="coerce")
-    geo = geo.dropna(subset=["geolocation_state", "geolocation_lat", "geolocation_lng"])
-
-    centroids = (
-        geo.groupby("geolocation_state", as_index=False)
-        .agg(
-            lat=("geolocation_lat", "mean"),
-            lon=("geolocation_lng", "mean"),
-        )
-        .rename(columns={"geolocation_state": "seller_state"})
+    return pd.DataFrame(
+        [(state, lat, lon) for state, (lat, lon) in _STATE_CENTROIDS.items()],
+        columns=["seller_state", "lat", "lon"],
     )
-    return centroids
 
 
 def _seller_agg(df: pd.DataFrame) -> pd.DataFrame:
     agg = (
-        df.groupby(["seller_id", "seller_state"], as_index=False)
+        df.groupby(["seller_id", "seller_state"], as_index=False, observed=True)
         .agg(
-            orders=("order_id", "nunique"),
+            orders=("order_code", "nunique"),
             items=("order_id", "count"),
             revenue=("price", "sum"),
             freight=("freight_value", "sum"),
         )
         .sort_values("revenue", ascending=False)
     )
-    agg["avg_order_value"] = (agg["revenue"] / agg["orders"].replace(0, pd.NA)).fillna(0.0)
-    agg["freight_ratio_pct"] = ((agg["freight"] / agg["revenue"].replace(0, pd.NA)) * 100.0).fillna(0.0)
-    return agg
+    return agg.assign(
+        avg_order_value=(agg["revenue"] / agg["orders"].replace(0, pd.NA)).fillna(0.0),
+        freight_ratio_pct=((agg["freight"] / agg["revenue"].replace(0, pd.NA)) * 100.0).fillna(0.0),
+    )
 
 
 def render():
@@ -89,9 +68,9 @@ def render():
     st.caption("Map shows the top seller in each state after your filters.")
 
     df = load_seller_orders()
-    df = df[df["order_status"] == "delivered"].copy()
-    min_date = df["order_date"].min()
-    max_date = df["order_date"].max()
+    df = df[df["order_status"] == "delivered"]
+    min_date = df["order_date"].min().date()
+    max_date = df["order_date"].max().date()
 
     states = sorted(df["seller_state"].dropna().unique().tolist())
 
@@ -124,38 +103,37 @@ def render():
     else:
         start_date, end_date = min_date, max_date
 
-    filtered = df[(df["order_date"] >= start_date) & (df["order_date"] <= end_date)].copy()
+    order_date = df["order_date"].to_numpy()
+    in_range = (order_date >= np.datetime64(start_date)) & (order_date <= np.datetime64(end_date))
+    filtered = df[in_range]
     if selected_states:
-        filtered = filtered[filtered["seller_state"].isin(selected_states)].copy()
+        filtered = filtered[filtered["seller_state"].isin(selected_states)]
 
     if filtered.empty:
         st.warning("No data after filters.")
         return
 
     seller_stats = _seller_agg(filtered)
-    seller_stats = seller_stats[seller_stats["orders"] >= min_orders].copy()
+    seller_stats = seller_stats[seller_stats["orders"] >= min_orders]
     if seller_stats.empty:
         st.warning("No sellers match the minimum orders filter.")
         return
 
     state_seller_counts = (
-        seller_stats.groupby("seller_state", as_index=False)
+        seller_stats.groupby("seller_state", as_index=False, observed=True)
         .agg(number_of_sellers=("seller_id", "nunique"))
     )
 
     # One top seller per state; when ranking by number_of_sellers, seller selection is by revenue.
     seller_pick_metric = "revenue" if rank_metric == "number_of_sellers" else rank_metric
-    top_by_state = (
-        seller_stats.sort_values(seller_pick_metric, ascending=False)
-        .groupby("seller_state", as_index=False)
-        .first()
-    )
+    top_idx = seller_stats.groupby("seller_state", observed=True)[seller_pick_metric].idxmax()
+    top_by_state = seller_stats.loc[top_idx]
     top_by_state = top_by_state.merge(state_seller_counts, on="seller_state", how="left")
     top_by_state = top_by_state.sort_values(rank_metric, ascending=False).head(max_states)
 
     centroids = load_state_centroids()
     map_df = top_by_state.merge(centroids, on="seller_state", how="left")
-    map_df = map_df.dropna(subset=["lat", "lon"]).copy()
+    map_df = map_df.dropna(subset=["lat", "lon"])
 
     if map_df.empty:
         st.warning("Could not map selected states (missing centroid coordinates).")
@@ -163,7 +141,7 @@ def render():
 
     metric_max = float(map_df[rank_metric].max()) if len(map_df) else 1.0
     metric_max = metric_max if metric_max > 0 else 1.0
-    map_df["radius"] = (map_df[rank_metric] / metric_max) * 45000 + 8000
+    map_df = map_df.assign(radius=(map_df[rank_metric] / metric_max) * 45000 + 8000)
 
     layer = pdk.Layer(
         "ScatterplotLayer",
@@ -1,45 +1,83 @@
-from pathlib import Path
+from typing import NamedTuple
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import streamlit as st
 
+from data import load_items, load_orders, load_persisted
 
-def _resolve_data_dir() -> Path:
-    local = Path("data")
-    if local.exists():
-        return local
-    return Path("/mnt/data")
 
+@st.cache_data(show_spinner=True)
+def load_seller_revenue_base() -> pd.DataFrame:
+    return load_persisted(
+        "seller_revenue_base",
+        ["olist_order_items_dataset.csv", "olist_orders_dataset.csv"],
+        _build_seller_revenue_base,
+    )
 
-DATA_DIR = _resolve_data_dir()
 
+def _build_seller_revenue_base() -> pd.DataFrame:
+    items = load_items()[["order_id", "seller_id", "price"]]
+    orders = load_orders()[["order_id", "order_purchase_timestamp", "order_status"]]
 
-@st.cache_data(show_spinner=False)
-def read_csv(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path.resolve()}")
-    return pd.read_csv(path)
+    df = items.merge(orders, on="order_id", how="left")
+    df = df.dropna(subset=["order_purchase_timestamp", "seller_id"])
+    df["order_date"] = df["order_purchase_timestamp"].dt.normalize()
+    # Integer codes make the per-period distinct seller count a code count, not a string hash.
+    df["seller_id"] = df["seller_id"].astype("category")
+    return df
 
 
-@st.cache_data(show_spinner=True)
-def load_seller_revenue_base() -> pd.DataFrame:
-    items = read_csv("olist_order_items_dataset.csv")[["order_id", "seller_id", "price"]].copy()
-    orders = read_csv("olist_orders_dataset.csv")[
-        ["order_id", "order_purchase_timestamp", "order_status"]
-    ].copy()
-
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0.0)
-    orders["order_purchase_timestamp"] = pd.to_datetime(
-        orders["order_purchase_timestamp"], errors="coerce"
+class SellerDayCube(NamedTuple):
+    """Delivered sales as parallel arrays, one row per (day, seller), ascending by day.
+
+    Days are integer day numbers since the epoch. ``order_day``/``orders`` hold the
+    distinct order count for each day that has sales.
+    """
+
+    day: np.ndarray
+    seller_code: np.ndarray
+    revenue: np.ndarray
+    items: np.ndarray
+    order_day: np.ndarray
+    orders: np.ndarray
+    n_sellers: int
+
+
+def _day_numbers(dates: pd.Series) -> np.ndarray:
+    return dates.to_numpy().astype("datetime64[D]").astype(np.int32)
+
+
+@st.cache_data(show_spinner=False)
+def load_seller_daily_cube() -> SellerDayCube:
+    # An order has a single purchase day, so per-day distinct order counts add up exactly.
+    df = load_seller_revenue_base()
+    df = df[df["order_status"] == "delivered"]
+    cube = df.groupby(["order_date", "seller_id"], as_index=False, observed=True).agg(
+        revenue=("price", "sum"),
+        items=("order_id", "count"),
+    )
+    daily_orders = (
+        df.drop_duplicates("order_id")
+        .groupby("order_date", as_index=False)
+        .size()
+        .rename(columns={"size": "orders"})
+    )
+    return SellerDayCube(
+        day=_day_numbers(cube["order_date"]),
+        seller_code=cube["seller_id"].cat.codes.to_numpy(np.int32),
+        revenue=cube["revenue"].to_numpy(),
+        items=cube["items"].to_numpy(np.int32),
+        order_day=_day_numbers(daily_orders["order_date"]),
+        orders=daily_orders["orders"].to_numpy(np.int32),
+        n_sellers=len(cube["seller_id"].cat.categories),
     )
 
-    df = items.merge(orders, on="order_id", how="left")
-    df = df.dropna(subset=["order_purchase_timestamp", "seller_id"]).copy()
-    df["order_date"] = df["order_purchase_timestamp"].dt.date
-    return df
+
+def _date_slice(days: np.ndarray, start_date, end_date) -> slice:
+    start = np.datetime64(start_date, "D").astype(np.int32)
+    end = np.datetime64(end_date, "D").astype(np.int32)
+    return slice(np.searchsorted(days, start), np.searchsorted(days, end, side="right"))
 
 
 def _period_rule(granularity: str) -> str:
@@ -51,37 +89,69 @@ def _period_rule(granularity: str) -> str:
     }[granularity]
 
 
-def _format_period_label(ts: pd.Timestamp, granularity: str) -> str:
-    if granularity == "Weekly":
-        return ts.strftime("%Y-%m-%d")
-    if granularity == "Monthly":
-        return ts.strftime("%Y-%m")
-    if granularity == "Quarterly":
-        return f"{ts.year} Q{((ts.month - 1) // 3) + 1}"
-    return str(ts.year)
-
-
-def _aggregate_period(df: pd.DataFrame, granularity: str) -> pd.DataFrame:
-    rule = _period_rule(granularity)
-    period = df["order_purchase_timestamp"].dt.to_period(rule).rename("period")
-    agg = (
-        df.groupby(period)
-        .agg(
-            active_sellers=("seller_id", "nunique"),
-            revenue=("price", "sum"),
-            orders=("order_id", "nunique"),
-            items=("order_id", "count"),
-        )
-        .reset_index()
-        .sort_values("period")
+# Weekly periods print their end date, so weeks are labelled from their start day instead.
+_LABEL_FORMAT = {
+    "Weekly": "%Y-%m-%d",
+    "Monthly": "%Y-%m",
+    "Quarterly": "%Y Q%q",
+    "Yearly": "%Y",
+}
+
+
+def _aggregate_period(
+    cube: SellerDayCube, rows: slice, order_rows: slice, granularity: str
+) -> pd.DataFrame:
+    day = cube.day[rows]
+    first = int(day[0])
+    span = np.arange(first, int(day[-1]) + 1).astype("datetime64[D]")
+    day_bucket, periods = pd.factorize(pd.DatetimeIndex(span).to_period(_period_rule(granularity)))
+    bucket = day_bucket[day - first]
+    n_buckets = len(periods)
+
+    # Bucket x seller bitmap: scatter marks each seen pair, a row count gives active sellers.
+    seen = np.zeros((n_buckets, cube.n_sellers), dtype=bool)
+    seen[bucket, cube.seller_code[rows]] = True
+    active_sellers = np.count_nonzero(seen, axis=1)
+    revenue = np.bincount(bucket, weights=cube.revenue[rows], minlength=n_buckets)
+    items = np.bincount(bucket, weights=cube.items[rows], minlength=n_buckets)
+    order_bucket = day_bucket[cube.order_day[order_rows] - first]
+    orders = np.bincount(order_bucket, weights=cube.orders[order_rows], minlength=n_buckets)
+
+    present = active_sellers > 0
+    revenue, active_sellers = revenue[present], active_sellers[present]
+    agg = pd.DataFrame(
+        {
+            "period": periods[present],
+            "active_sellers": active_sellers,
+            "revenue": revenue,
+            "orders": orders[present].astype(np.int64),
+            "items": items[present].astype(np.int64),
+            "revenue_per_seller": np.divide(
+                revenue, active_sellers, out=np.zeros_like(revenue), where=active_sellers > 0
+            ),
+        }
     )
-    agg["period_start"] = agg["period"].dt.start_time
-    agg["label"] = agg["period_start"].apply(lambda d: _format_period_label(d, granularity))
-    agg["revenue_per_seller"] = agg["revenue"] / agg["active_sellers"].replace(0, pd.NA)
-    agg["revenue_per_seller"] = agg["revenue_per_seller"].fillna(0.0)
+    labelled = agg["period"].dt.start_time if granularity == "Weekly" else agg["period"]
+    agg["label"] = labelled.dt.strftime(_LABEL_FORMAT[granularity])
     return agg
 
 
+_POINT_TOOLTIP = [
+    {"field": "label", "type": "nominal", "title": "Period"},
+    {"field": "active_sellers", "type": "quantitative", "title": "Active sellers", "format": ","},
+    {"field": "revenue", "type": "quantitative", "title": "Revenue", "format": ",.2f"},
+    {"field": "orders", "type": "quantitative", "title": "Orders", "format": ","},
+    {"field": "items", "type": "quantitative", "title": "Items", "format": ","},
+]
+
+
+def _fit_line(x: np.ndarray, y: np.ndarray) -> tuple[float, float]:
+    # Closed-form degree-1 least squares; same line as np.polyfit.
+    dx = x - x.mean()
+    slope = float(dx @ (y - y.mean()) / (dx @ dx))
+    return slope, float(y.mean() - slope * x.mean())
+
+
 def render():
     st.title("🎯 Seller Count vs Revenue Correlation")
     st.caption(
@@ -90,8 +160,8 @@ def render():
     )
 
     df = load_seller_revenue_base()
-    min_date = df["order_date"].min()
-    max_date = df["order_date"].max()
+    min_date = df["order_date"].min().date()
+    max_date = df["order_date"].max().date()
 
     with st.sidebar:
         st.subheader("Page 6 controls")
@@ -113,18 +183,16 @@ def render():
     else:
         start_date, end_date = min_date, max_date
 
-    filtered = df[
-        (df["order_date"] >= start_date)
-        & (df["order_date"] <= end_date)
-        & (df["order_status"] == "delivered")
-    ].copy()
+    cube = load_seller_daily_cube()
+    rows = _date_slice(cube.day, start_date, end_date)
+    order_rows = _date_slice(cube.order_day, start_date, end_date)
 
-    if filtered.empty:
+    if rows.start == rows.stop:
         st.warning("No data after filters.")
         return
 
-    agg = _aggregate_period(filtered, granularity)
-    agg = agg[agg["active_sellers"] >= min_active_sellers].copy()
+    agg = _aggregate_period(cube, rows, order_rows, granularity)
+    agg = agg[agg["active_sellers"] >= min_active_sellers]
     if agg.empty:
         st.warning("No periods remain after the minimum seller threshold.")
         return
@@ -134,40 +202,79 @@ def render():
     corr = x.corr(y)
 
     size_min, size_max = 40.0, 420.0
-    orders_norm = agg["orders"].astype(float)
-    if orders_norm.max() > orders_norm.min():
-        marker_sizes = size_min + ((orders_norm - orders_norm.min()) / (orders_norm.max() - orders_norm.min())) * (size_max - size_min)
+    orders = agg["orders"].to_numpy(np.float64)
+    span = np.ptp(orders)
+    if span > 0:
+        marker_sizes = size_min + (orders - orders.min()) * ((size_max - size_min) / span)
     else:
-        marker_sizes = pd.Series([160.0] * len(agg), index=agg.index)
-
-    fig, ax = plt.subplots(figsize=(13, 7))
-    scatter = ax.scatter(
-        agg["active_sellers"],
-        agg["revenue"],
-        s=marker_sizes,
-        c=agg["orders"],
-        cmap="viridis",
-        alpha=0.78,
-        edgecolors="white",
-        linewidths=0.7,
+        marker_sizes = np.full(len(orders), 160.0)
+
+    points = agg[["label", "active_sellers", "revenue", "orders", "items"]].assign(
+        marker_size=marker_sizes
     )
-    cbar = fig.colorbar(scatter, ax=ax, pad=0.01)
-    cbar.set_label("Orders in period")
+    layers = [
+        {
+            "data": {"name": "periods"},
+            "mark": {"type": "circle", "opacity": 0.78, "stroke": "white", "strokeWidth": 0.7},
+            "encoding": {
+                "x": {
+                    "field": "active_sellers",
+                    "type": "quantitative",
+                    "title": "Active Sellers (unique seller_id)",
+                    "scale": {"zero": False},
+                },
+                "y": {
+                    "field": "revenue",
+                    "type": "quantitative",
+                    "title": "Revenue (sum of item price)",
+                    "scale": {"zero": False},
+                },
+                # Sizes are already in pixel area, so Vega-Lite must not rescale them.
+                "size": {"field": "marker_size", "type": "quantitative", "scale": None, "legend": None},
+                "color": {
+                    "field": "orders",
+                    "type": "quantitative",
+                    "scale": {"scheme": "viridis"},
+                    "title": "Orders in period",
+                },
+                "tooltip": _POINT_TOOLTIP,
+            },
+        }
+    ]
+    datasets = {"periods": points}
 
     if len(agg) >= 2 and agg["active_sellers"].nunique() > 1:
-        m, b = np.polyfit(agg["active_sellers"], agg["revenue"], 1)
-        xs = np.linspace(float(agg["active_sellers"].min()), float(agg["active_sellers"].max()), 100)
-        ys = m * xs + b
-        ax.plot(xs, ys, color="#E45756", linewidth=2.2, linestyle="--", label="Trend line")
-
-    ax.set_title(f"Correlation by {granularity} Period")
-    ax.set_xlabel("Active Sellers (unique seller_id)")
-    ax.set_ylabel("Revenue (sum of item price)")
-    ax.grid(True, linestyle="--", alpha=0.35)
-    if len(agg) >= 2:
-        ax.legend(loc="upper left")
-    plt.tight_layout()
-    st.pyplot(fig, clear_figure=True)
+        m, b = _fit_line(x.to_numpy(), y.to_numpy())
+        xs = np.array([x.min(), x.max()])
+        datasets["trend"] = pd.DataFrame(
+            {"active_sellers": xs, "revenue": m * xs + b, "series": "Trend line"}
+        )
+        layers.append(
+            {
+                "data": {"name": "trend"},
+                "mark": {"type": "line", "color": "#E45756", "strokeWidth": 2.2},
+                "encoding": {
+                    "x": {"field": "active_sellers", "type": "quantitative"},
+                    "y": {"field": "revenue", "type": "quantitative"},
+                    "strokeDash": {
+                        "field": "series",
+                        "type": "nominal",
+                        "scale": {"range": [[6, 4]]},
+                        "legend": {"title": None, "orient": "top-left"},
+                    },
+                },
+            }
+        )
+
+    # Hand-written Vega-Lite, as on page_2.
+    spec = {
+        "$schema": "https://vega.github.io/schema/vega-lite/v5.json",
+        "datasets": datasets,
+        "title": f"Correlation by {granularity} Period",
+        "layer": layers,
+        "height": 480,
+    }
+    st.vega_lite_chart(spec, use_container_width=True)
 
     c1, c2, c3, c4 = st.columns(4)
     with c1:
@@ -1,77 +1,88 @@
-from pathlib import Path
-
+from matplotlib import colormaps
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
 import matplotlib.pyplot as plt
 from matplotlib.ticker import FuncFormatter
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-
-def _resolve_data_dir() -> Path:
-    local = Path("data")
-    if local.exists():
-        return local
-    return Path("/mnt/data")
-
-
-DATA_DIR = _resolve_data_dir()
-
-
-@st.cache_data(show_spinner=False)
-def read_csv(name: str) -> pd.DataFrame:
-    path = DATA_DIR / name
-    if not path.exists():
-        raise FileNotFoundError(f"Missing file: {path.resolve()}")
-    return pd.read_csv(path)
+from data import load_items, load_orders, load_persisted, load_products_with_category
 
 
 @st.cache_data(show_spinner=True)
 def load_category_sales_base() -> pd.DataFrame:
-    items = read_csv("olist_order_items_dataset.csv")[["order_id", "product_id", "price"]].copy()
-    orders = read_csv("olist_orders_dataset.csv")[
-        ["order_id", "order_purchase_timestamp", "order_status"]
-    ].copy()
-    products = read_csv("olist_products_dataset.csv")[["product_id", "product_category_name"]].copy()
-
-    translation_path = DATA_DIR / "product_category_name_translation.csv"
-    if translation_path.exists():
-        trans = pd.read_csv(translation_path)
-        products = products.merge(trans, on="product_category_name", how="left")
-        category_col = "product_category_name_english"
-    else:
-        category_col = "product_category_name"
-
-    products[category_col] = products[category_col].fillna("unknown")
-    items["price"] = pd.to_numeric(items["price"], errors="coerce").fillna(0.0)
-    orders["order_purchase_timestamp"] = pd.to_datetime(
-        orders["order_purchase_timestamp"], errors="coerce"
+    return load_persisted(
+        "category_sales_base",
+        [
+            "olist_order_items_dataset.csv",
+            "olist_orders_dataset.csv",
+            "olist_products_dataset.csv",
+            "product_category_name_translation.csv",
+        ],
+        _build_category_sales_base,
     )
 
+
+def _build_category_sales_base() -> pd.DataFrame:
+    items = load_items()[["order_id", "product_id", "price"]]
+    orders = load_orders()[["order_id", "order_purchase_timestamp", "order_status"]]
+    products = load_products_with_category()
+
     df = items.merge(orders, on="order_id", how="left")
-    df = df.merge(products[["product_id", category_col]], on="product_id", how="left")
-    df = df.dropna(subset=["order_purchase_timestamp"]).copy()
-    df[category_col] = df[category_col].fillna("unknown")
-    df["order_date"] = df["order_purchase_timestamp"].dt.date
-    return df.rename(columns={category_col: "category"})
-
-
-def _window_aggregate(df: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
-    scoped = df[
-        (df["order_purchase_timestamp"] >= start)
-        & (df["order_purchase_timestamp"] <= end)
-        & (df["order_status"] == "delivered")
-    ].copy()
-
-    agg = (
-        scoped.groupby("category", as_index=False)
-        .agg(
-            revenue=("price", "sum"),
-            orders=("order_id", "nunique"),
-            items=("order_id", "count"),
-            avg_item_price=("price", "mean"),
+    df = df.merge(products, on="product_id", how="left")
+    df = df.dropna(subset=["order_purchase_timestamp"])
+    df["category"] = df["category"].fillna("unknown").astype("category")
+    df["order_id"] = df["order_id"].astype("category")
+    return df
+
+
+@st.cache_data(show_spinner=False)
+def load_delivered_category_sales() -> pd.DataFrame:
+    # Delivered rows in purchase-time order, so each window is a contiguous slice.
+    df = load_category_sales_base()
+    df = df[df["order_status"] == "delivered"]
+    return df.sort_values("order_purchase_timestamp", kind="stable", ignore_index=True)
+
+
+def _window_aggregates(
+    df: pd.DataFrame, previous_start: pd.Timestamp, current_start: pd.Timestamp, end: pd.Timestamp
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # The previous window ends where the current one starts: one sorted slice covers both.
+    ts = df["order_purchase_timestamp"].to_numpy()
+    lo = np.searchsorted(ts, previous_start.to_datetime64())
+    mid = np.searchsorted(ts, current_start.to_datetime64())
+    hi = np.searchsorted(ts, end.to_datetime64(), side="right")
+
+    n_categories = len(df["category"].cat.categories)
+    n_orders = len(df["order_id"].cat.categories)
+    n_buckets = 2 * n_categories
+    bucket = df["category"].cat.codes.to_numpy()[lo:hi].astype(np.int64)
+    bucket[mid - lo :] += n_categories
+
+    price = df["price"].to_numpy()[lo:hi]
+    revenue = np.bincount(bucket, weights=price, minlength=n_buckets).reshape(2, -1)
+    items = np.bincount(bucket, minlength=n_buckets).reshape(2, -1)
+    # An order can span categories, so distinct (bucket, order) keys are counted per bucket.
+    keys = np.unique(bucket * n_orders + df["order_id"].cat.codes.to_numpy(np.int64)[lo:hi])
+    orders = np.bincount(keys // n_orders, minlength=n_buckets).reshape(2, -1)
+
+    frames = []
+    for w in (1, 0):
+        present = np.flatnonzero(items[w])
+        frames.append(
+            pd.DataFrame(
+                {
+                    "category": pd.Categorical.from_codes(present, dtype=df["category"].dtype),
+                    "revenue": revenue[w, present],
+                    "orders": orders[w, present],
+                    "items": items[w, present],
+                    "avg_item_price": revenue[w, present] / items[w, present],
+                }
+            )
         )
-        .sort_values("revenue", ascending=False)
-    )
-    return agg
+    current, previous = frames
+    return current, previous
 
 
 def render():
@@ -118,14 +129,16 @@ def render():
     previous_end_day = current_start - pd.Timedelta(days=1)
     previous_start_day = previous_end_day - pd.Timedelta(days=window_days - 1)
     previous_start = previous_start_day.normalize()
-    previous_end = previous_end_day + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
 
     if previous_start < min_ts:
         st.warning("Not enough historical data for comparison. Move the date range forward.")
         return
 
-    current_agg = _window_aggregate(df, current_start, current_end)
-    previous_agg = _window_aggregate(df, previous_start, previous_end).rename(
+    delivered = load_delivered_category_sales()
+    current_agg, previous_agg = _window_aggregates(
+        delivered, previous_start, current_start, current_end
+    )
+    previous_agg = previous_agg.rename(
         columns={
             "revenue": "prev_revenue",
             "orders": "prev_orders",
@@ -138,41 +151,53 @@ def render():
         st.warning("No delivered-order data in the selected range.")
         return
 
-    top_categories = current_agg["category"].head(top_n).tolist()
-    plot_df = current_agg[current_agg["category"].isin(top_categories)].copy()
-    plot_df = plot_df[plot_df["orders"] >= min_orders].copy()
+    revenue = current_agg["revenue"].to_numpy()
+    k = min(top_n, len(revenue))
+    top = np.argpartition(-revenue, k - 1)[:k]
+    plot_df = current_agg.iloc[top[np.argsort(-revenue[top], kind="stable")]]
+    plot_df = plot_df[plot_df["orders"] >= min_orders]
     if plot_df.empty:
         st.warning("No categories left after the minimum orders filter.")
         return
 
     plot_df = plot_df.merge(previous_agg, on="category", how="left")
-    plot_df["prev_revenue"] = plot_df["prev_revenue"].fillna(0.0)
-    plot_df["growth_pct"] = (
-        (plot_df["revenue"] - plot_df["prev_revenue"]) / plot_df["prev_revenue"].replace(0, pd.NA)
-    ) * 100.0
-    plot_df["growth_defined"] = plot_df["prev_revenue"] > 0
+    prev_revenue = plot_df["prev_revenue"].fillna(0.0).to_numpy()
+    growth_defined = prev_revenue > 0
+    growth = np.divide(
+        plot_df["revenue"].to_numpy() - prev_revenue,
+        prev_revenue,
+        out=np.full_like(prev_revenue, np.nan),
+        where=growth_defined,
+    )
+    plot_df = plot_df.assign(
+        prev_revenue=prev_revenue,
+        growth_pct=growth * 100.0,
+        growth_defined=growth_defined,
+    )
 
-    chart_df = plot_df[plot_df["growth_defined"]].copy()
+    chart_df = plot_df[plot_df["growth_defined"]]
     if chart_df.empty:
         st.warning("No categories have previous-period revenue, so growth cannot be computed.")
         return
 
     size_min, size_max = 70.0, 900.0
-    orders_norm = chart_df["orders"].astype(float)
-    if orders_norm.max() > orders_norm.min():
-        marker_sizes = size_min + (
-            (orders_norm - orders_norm.min()) / (orders_norm.max() - orders_norm.min())
-        ) * (size_max - size_min)
+    orders = chart_df["orders"].to_numpy(np.float64)
+    span = np.ptp(orders)
+    if span > 0:
+        marker_sizes = size_min + (orders - orders.min()) * ((size_max - size_min) / span)
     else:
-        marker_sizes = pd.Series([250.0] * len(chart_df), index=chart_df.index)
+        marker_sizes = np.full(len(orders), 250.0)
+
+    avg_price = chart_df["avg_item_price"].to_numpy()
+    norm = Normalize(vmin=avg_price.min(), vmax=avg_price.max())
+    cmap = colormaps["plasma"]
 
     fig, ax = plt.subplots(figsize=(13, 7))
-    scatter = ax.scatter(
+    ax.scatter(
         chart_df["growth_pct"],
         chart_df["revenue"],
         s=marker_sizes,
-        c=chart_df["avg_item_price"],
-        cmap="plasma",
+        c=cmap(norm(avg_price)),
         alpha=0.82,
         edgecolors="white",
         linewidths=0.8,
@@ -184,14 +209,17 @@ def render():
     ax.set_title("Category Momentum Matrix")
     ax.yaxis.set_major_formatter(FuncFormatter(lambda v, _: f"{v:,.0f}"))
 
-    cbar = fig.colorbar(scatter, ax=ax, pad=0.01)
+    cbar = fig.colorbar(ScalarMappable(norm=norm, cmap=cmap), ax=ax, pad=0.01)
     cbar.set_label("Average Item Price")
 
-    for row in chart_df.itertuples(index=False):
-        label = row.category if len(row.category) <= 18 else f"{row.category[:17]}…"
+    names = chart_df["category"].astype(str)
+    labels = names.where(names.str.len() <= 18, names.str.slice(0, 17) + "…")
+    for label, growth, revenue in zip(
+        labels.to_numpy(), chart_df["growth_pct"].to_numpy(), chart_df["revenue"].to_numpy()
+    ):
         ax.annotate(
             label,
-            (row.growth_pct, row.revenue),
+            (growth, revenue),
             textcoords="offset points",
             xytext=(0, 11),
             ha="center",
@@ -229,8 +257,7 @@ def render():
 
     table = plot_df[
         ["category", "revenue", "prev_revenue", "growth_pct", "orders", "items", "avg_item_price"]
-    ].copy()
-    table = table.sort_values("revenue", ascending=False)
+    ].sort_values("revenue", ascending=False)
 
     st.subheader("Category Comparison Table")
     st.dataframe(table, use_container_width=True)
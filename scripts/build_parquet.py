@@ -0,0 +1,35 @@
+# scripts/build_parquet.py
+# Converts the Olist CSVs to Snappy-compressed Parquet siblings, ahead of first use.
+# Run from the project root: python scripts/build_parquet.py [--force]
+# Up-to-date files are skipped; --force rewrites every one.
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import data  # noqa: E402  (needs the project root on sys.path)
+
+
+def build(force: bool = False) -> list[Path]:
+    written: list[Path] = []
+    for csv_path in sorted(data.DATA_DIR.glob("*.csv")):
+        out = csv_path.with_suffix(".parquet")
+        if not force and data._source_path(csv_path.name) == out:
+            continue
+        started = time.time_ns()
+        df = data._parse_csv(csv_path)
+        if csv_path.name == "olist_products_dataset.csv":
+            df = data._with_english_category(df)
+        data._write_parquet(df, out)
+        # _write_parquet is best-effort, so only report files that were actually replaced.
+        if out.exists() and out.stat().st_mtime_ns >= started:
+            written.append(out)
+        else:
+            print(f"could not write {out}", file=sys.stderr)
+    return written
+
+
+if __name__ == "__main__":
+    for path in build(force="--force" in sys.argv[1:]):
+        print(f"wrote {path}")
@@ -1,31 +1,46 @@
 import streamlit as st
+from matplotlib.figure import Figure
+
+
+_GLOBAL_CSS = """
+<style>
+/* Reduce top padding, make layout feel tighter */
+.block-container { padding-top: 1.2rem; padding-bottom: 2rem; }
+
+/* Sidebar spacing */
+section[data-testid="stSidebar"] .block-container { padding-top: 1.2rem; }
+
+/* Metric cards look cleaner */
+div[data-testid="stMetric"] {
+    background: white;
+    border: 1px solid rgba(17,24,39,0.08);
+    padding: 12px 14px;
+    border-radius: 14px;
+}
+
+/* Expander style */
+details {
+    border-radius: 14px !important;
+    border: 1px solid rgba(17,24,39,0.08) !important;
+    background: white;
+    padding: 6px 10px;
+}
+</style>
+"""
+
 
 def inject_global_css():
-    st.markdown(
-        """
-        <style>
-        /* Reduce top padding, make layout feel tighter */
-        .block-container { padding-top: 1.2rem; padding-bottom: 2rem; }
-
-        /* Sidebar spacing */
-        section[data-testid="stSidebar"] .block-container { padding-top: 1.2rem; }
-
-        /* Metric cards look cleaner */
-        div[data-testid="stMetric"] {
-            background: white;
-            border: 1px solid rgba(17,24,39,0.08);
-            padding: 12px 14px;
-            border-radius: 14px;
-        }
-
-        /* Expander style */
-        details {
-            border-radius: 14px !important;
-            border: 1px solid rgba(17,24,39,0.08) !important;
-            background: white;
-            padding: 6px 10px;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
\ No newline at end of file
+    # Emitted on every rerun on purpose: Streamlit drops elements a run does not re-send,
+    # so a once-per-session guard would strip the styles after the first interaction.
+    st.markdown(_GLOBAL_CSS, unsafe_allow_html=True)
+
+
+def session_figure(key: str, figsize: tuple[float, float]) -> Figure:
+    # One Figure per session and chart, cleared on each rerun; kept out of pyplot's registry.
+    fig = st.session_state.get(key)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        st.session_state[key] = fig
+    else:
+        fig.clear()
+    return fig